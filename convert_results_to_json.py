@@ -4,6 +4,21 @@ Convert SimBench results from pickle format to JSON for web viewing.
 
 Usage:
     python convert_results_to_json.py input_file.pkl output_file.json
+    python convert_results_to_json.py input_file.pkl --format parquet
+
+The web explorer reads JSON. For large dumps, --format msgpack or parquet
+writes a much smaller binary file in which human_answer and
+Response_Distribution are dense float32 arrays aligned to a shared
+distribution_options list (msgpack stores them as raw little-endian float32
+bytes). These formats need the msgpack and pyarrow packages respectively.
+
+Compressed inputs are accepted too. For large benchmarks an LZ4-compressed
+pickle usually loads faster than a plain one, since decompression is cheaper
+than reading the extra bytes from disk. Producers can write one with:
+
+    joblib.dump(df, 'results.pkl.lz4', compress=('lz4', 3))
+
+.pkl.gz/.bz2/.xz/.zst files written by DataFrame.to_pickle() also work.
 """
 
 import pickle
@@ -11,76 +26,345 @@ import json
 import pandas as pd
 import numpy as np
 import argparse
+import itertools
+import multiprocessing
+import os
 import sys
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+# Output buffer size; records are written one by one, so batch the syscalls
+_WRITE_BUFFER_SIZE = 1024 * 1024
+# Rows per task handed to a worker process with --jobs
+_ROWS_PER_TASK = 10000
+
 
 def convert_to_json_compatible(obj):
-    """Convert numpy/pandas objects to JSON-compatible format."""
+    """Convert numpy/pandas objects to JSON-compatible format (stdlib fallback)."""
+    # Exact type checks first: they cover almost every value and avoid both
+    # the isinstance() MRO walk and pd.isna()'s generic dispatch
+    t = type(obj)
+    if t is str or t is int or t is bool or obj is None:
+        return obj
+    if t is float:
+        return None if obj != obj else obj
+    if t is dict:
+        return {str(k): convert_to_json_compatible(v) for k, v in obj.items()}
+    if t is list or t is tuple:
+        return [convert_to_json_compatible(item) for item in obj]
+    if isinstance(obj, np.ndarray):
+        return convert_to_json_compatible(obj.tolist())
     if isinstance(obj, (np.integer, np.floating)):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, dict):
+        return convert_to_json_compatible(obj.item())
+    if isinstance(obj, dict):
         return {str(k): convert_to_json_compatible(v) for k, v in obj.items()}
-    elif isinstance(obj, (list, tuple)):
+    if isinstance(obj, (list, tuple)):
         return [convert_to_json_compatible(item) for item in obj]
-    elif pd.isna(obj):
+    return None if pd.isna(obj) else obj
+
+
+def _orjson_default(obj):
+    """Serialise the few values orjson does not handle natively."""
+    if isinstance(obj, (np.integer, np.floating)):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if obj is pd.NA or obj is pd.NaT:
         return None
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def encode_json(obj):
+    """Encode obj as indented UTF-8 JSON bytes."""
+    if orjson is not None:
+        # orjson handles numpy scalars/arrays natively and only calls the
+        # default hook for unknown objects, so no conversion walk is needed
+        option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=option)
+        except TypeError:
+            # e.g. numpy scalar dict keys, which OPT_NON_STR_KEYS rejects;
+            # the conversion walk stringifies keys like the stdlib path does
+            return orjson.dumps(convert_to_json_compatible(obj), option=option)
+    return json.dumps(convert_to_json_compatible(obj), indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def write_json_chunks(chunks, json_path):
+    """
+    Stream pre-encoded chunks to a JSON array file.
+    
+    Args:
+        chunks: Iterable of (record_count, bytes) pairs, where the bytes hold
+            that many encoded records separated by b',\\n'
+        json_path: Path to output .json file
+    
+    Returns:
+        (records written, bytes written)
+    """
+    count = 0
+    with open(json_path, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+        nbytes = f.write(b'[')
+        for n, payload in chunks:
+            if not n:
+                continue
+            nbytes += f.write(b'\n' if count == 0 else b',\n')
+            nbytes += f.write(payload)
+            count += n
+        nbytes += f.write(b'\n]\n' if count else b']\n')
+    return count, nbytes
+
+
+def write_json_array(records, json_path):
+    """
+    Stream records to a JSON array file, encoding one record at a time.
+    
+    Only a single encoded record is held in memory, so peak memory does not
+    grow with the size of the output.
+    
+    Returns:
+        (records written, bytes written)
+    """
+    return write_json_chunks(((1, encode_json(item)) for item in records), json_path)
+
+
+def _encode_slice(sub_df):
+    """Encode one DataFrame slice as a (count, bytes) chunk; runs in a worker."""
+    encoded = [encode_json(item) for item in iter_records(sub_df)]
+    return len(encoded), b',\n'.join(encoded)
+
+
+def write_json_array_parallel(df, json_path, jobs):
+    """
+    Convert and encode slices of df in worker processes, writing in order.
+    
+    Returns:
+        (records written, bytes written)
+    """
+    slices = (df.iloc[start:start + _ROWS_PER_TASK] for start in range(0, len(df), _ROWS_PER_TASK))
+    with multiprocessing.Pool(jobs) as pool:
+        return write_json_chunks(pool.imap(_encode_slice, slices), json_path)
+
+
+# Output fields by kind: strings default to '', dicts to {}, and optional
+# fields are only emitted where the value is not NA
+_STRING_FIELDS = ('dataset_name', 'input_template', 'group_prompt_template', 'Model', 'Prompt_Method')
+_DICT_FIELDS = ('group_prompt_variable_map', 'human_answer', 'Response_Distribution')
+_OPTIONAL_FIELDS = ('System_Prompt', 'User_Prompt', 'Sum_of_Probs', 'auxiliary')
+# Fields present in every record, in output order
+_RECORD_FIELDS = (
+    'index', 'dataset_name', 'input_template', 'group_prompt_template', 'group_prompt_variable_map',
+    'human_answer', 'Response_Distribution', 'Model', 'Prompt_Method', 'group_size',
+)
+
+# Shared value for dict fields whose column is missing; never mutated
+_EMPTY_DICT = {}
+
+# Record fields holding a probability distribution over answer options
+_DISTRIBUTION_FIELDS = ('human_answer', 'Response_Distribution')
+# Free-form nested fields stored as JSON text in parquet output
+_JSON_TEXT_FIELDS = ('group_prompt_variable_map', 'auxiliary')
+# Default output suffix per --format choice
+OUTPUT_SUFFIXES = {'json': '.json', 'msgpack': '.msgpack', 'parquet': '.parquet'}
+
+
+def pack_distributions(item):
+    """
+    Store the distribution fields of a record as dense float32 arrays.
+    
+    Dict-valued distributions are aligned to a shared ``distribution_options``
+    list (the union of their keys); list-valued ones are kept positional.
+    """
+    dicts = [item[field] for field in _DISTRIBUTION_FIELDS if isinstance(item[field], dict)]
+    options = list(dict.fromkeys(key for d in dicts for key in d))
+    if dicts:
+        item['distribution_options'] = [str(key) for key in options]
+    for field in _DISTRIBUTION_FIELDS:
+        value = item[field]
+        if isinstance(value, dict):
+            item[field] = np.array([value.get(key, 0.0) for key in options], dtype=np.float32)
+        elif isinstance(value, (list, tuple, np.ndarray)):
+            item[field] = np.asarray(value, dtype=np.float32)
+    return item
+
+
+def _msgpack_default(obj):
+    """Serialise numpy/pandas values for msgpack; arrays become lists."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    raise TypeError(f"Type is not msgpack serializable: {type(obj).__name__}")
+
+
+def write_msgpack(records, path):
+    """
+    Stream records to path as a sequence of msgpack maps.
+    
+    Returns:
+        (records written, bytes written)
+    """
+    import msgpack
+    packer = msgpack.Packer(default=_msgpack_default, use_bin_type=True)
+    count = nbytes = 0
+    with open(path, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+        for item in records:
+            item = pack_distributions(item)
+            # only the packed distributions are stored as raw float32 bytes
+            for field in _DISTRIBUTION_FIELDS:
+                if isinstance(item[field], np.ndarray):
+                    item[field] = item[field].astype('<f4', copy=False).tobytes()
+            nbytes += f.write(packer.pack(item))
+            count += 1
+    return count, nbytes
+
+
+def write_parquet(records, path):
+    """
+    Write records to a zstd-compressed parquet file.
+    
+    Returns:
+        (records written, bytes written)
+    """
+    rows = []
+    for item in records:
+        item = pack_distributions(item)
+        for field in _JSON_TEXT_FIELDS:
+            if field in item:
+                item[field] = json.dumps(convert_to_json_compatible(item[field]), ensure_ascii=False)
+        rows.append(item)
+    # an empty input still gets the record columns
+    frame = pd.DataFrame(rows) if rows else pd.DataFrame(columns=list(_RECORD_FIELDS))
+    # A distribution column only becomes list<float32> if every value was
+    # packed; otherwise (e.g. bare label strings) keep the column as JSON text
+    for field in _DISTRIBUTION_FIELDS:
+        values = frame[field].tolist()
+        if not all(isinstance(v, np.ndarray) or v is None or (isinstance(v, float) and v != v)
+                   for v in values):
+            frame[field] = [json.dumps(convert_to_json_compatible(v), ensure_ascii=False) for v in values]
+    # path=None returns the encoded file as bytes
+    payload = frame.to_parquet(None, compression='zstd', index=False)
+    with open(path, 'wb') as f:
+        nbytes = f.write(payload)
+    return len(rows), nbytes
+
+
+def iter_records(df):
+    """Yield one JSON-ready dict per row of a SimBench results DataFrame."""
+    # Normalise every output column with vectorised pandas ops and
+    # materialise it once (structure-of-arrays), then zip the columns into
+    # records one row at a time as the caller consumes them.
+    if pd.api.types.is_integer_dtype(df.index):
+        columns = {'index': df.index.tolist()}
     else:
-        return obj
+        columns = {'index': [int(idx) if pd.notna(idx) else idx for idx in df.index]}
+
+    for field in _STRING_FIELDS:
+        if field in df.columns:
+            columns[field] = df[field].astype('string').fillna('').tolist()
+        else:
+            columns[field] = itertools.repeat('')
+    for field in _DICT_FIELDS:
+        columns[field] = df[field].tolist() if field in df.columns else itertools.repeat(_EMPTY_DICT)
+    if 'group_size' in df.columns:
+        columns['group_size'] = df['group_size'].fillna(0).astype('int64').tolist()
+    else:
+        columns['group_size'] = itertools.repeat(0)
+
+    # Optional fields: only the columns that exist, each with its NA mask
+    present = [field for field in _OPTIONAL_FIELDS if field in df.columns]
+    if present:
+        optional_rows = zip(*(df[field].tolist() for field in present))
+        notna_rows = zip(*(df[field].notna().tolist() for field in present))
+    else:
+        optional_rows = notna_rows = itertools.repeat(())
+
+    rows = zip(*(columns[field] for field in _RECORD_FIELDS))
+    for values, optional, notna in zip(rows, optional_rows, notna_rows):
+        item = dict(zip(_RECORD_FIELDS, values))
+
+        # Add optional fields if they exist
+        for field, value, keep in zip(present, optional, notna):
+            if keep:
+                item[field] = value
+
+        yield item
 
 
-def pickle_to_json(pickle_path, json_path):
+# Suffixes of pickles written through joblib (which handles the codec)
+_JOBLIB_SUFFIXES = ('.lz4', '.joblib')
+# Suffixes pandas decompresses transparently in read_pickle()
+_PANDAS_COMPRESSION_SUFFIXES = ('.gz', '.bz2', '.xz', '.zst', '.zip')
+
+
+def pickle_protocol(pickle_path):
+    """Return the protocol of a plain pickle file, or None if it has no PROTO header."""
+    with open(pickle_path, 'rb') as f:
+        header = f.read(2)
+    if len(header) == 2 and header[:1] == pickle.PROTO:
+        return header[1]
+    return None
+
+
+def load_results(pickle_path):
+    """
+    Load a SimBench results DataFrame from a plain or compressed pickle.
+    
+    Args:
+        pickle_path: Path to a .pkl file, optionally compressed (.pkl.lz4,
+            .pkl.gz, ...)
+    """
+    suffix = Path(pickle_path).suffix
+    if suffix in _JOBLIB_SUFFIXES:
+        import joblib
+        return joblib.load(pickle_path)
+    if suffix not in _PANDAS_COMPRESSION_SUFFIXES:
+        protocol = pickle_protocol(pickle_path)
+        if protocol is not None and protocol < 5:
+            print(f"⚠ Warning: {pickle_path} uses pickle protocol {protocol}; re-saving it with "
+                  f"protocol 5 loads faster:\n"
+                  f"    Path(path).write_bytes(pickletools.optimize(pickle.dumps(df, protocol=5)))",
+                  file=sys.stderr)
+    # compression='infer' picks the codec from the suffix; plain .pkl is read as-is
+    return pd.read_pickle(pickle_path, compression='infer')
+
+
+def pickle_to_json(pickle_path, json_path, output_format='json', jobs=1):
     """
     Convert a pickle file containing SimBench results to JSON format.
     
     Args:
         pickle_path: Path to input .pkl file
-        json_path: Path to output .json file
+        json_path: Path to output file
+        output_format: 'json' (default), 'msgpack' or 'parquet'
+        jobs: Worker processes for JSON conversion (-1 = all cores)
     """
     print(f"Loading pickle file: {pickle_path}")
     
     try:
         # Load the pickle file
-        with open(pickle_path, 'rb') as f:
-            df = pd.read_pickle(f)
+        df = load_results(pickle_path)
         
         print(f"Loaded {len(df)} records")
         
-        # Convert to list of dictionaries
-        data = []
-        for idx, row in df.iterrows():
-            # Extract relevant fields
-            item = {
-                'index': int(idx) if not pd.isna(idx) else idx,
-                'dataset_name': str(row.get('dataset_name', '')) if pd.notna(row.get('dataset_name')) else '',
-                'input_template': str(row.get('input_template', '')) if pd.notna(row.get('input_template')) else '',
-                'group_prompt_template': str(row.get('group_prompt_template', '')) if pd.notna(row.get('group_prompt_template')) else '',
-                'group_prompt_variable_map': convert_to_json_compatible(row.get('group_prompt_variable_map', {})),
-                'human_answer': convert_to_json_compatible(row.get('human_answer', {})),
-                'Response_Distribution': convert_to_json_compatible(row.get('Response_Distribution', {})),
-                'Model': str(row.get('Model', '')) if pd.notna(row.get('Model')) else '',
-                'Prompt_Method': str(row.get('Prompt_Method', '')) if pd.notna(row.get('Prompt_Method')) else '',
-                'group_size': int(row.get('group_size', 0)) if pd.notna(row.get('group_size')) else 0,
-            }
-            
-            # Add optional fields if they exist
-            optional_fields = ['System_Prompt', 'User_Prompt', 'Sum_of_Probs', 'auxiliary']
-            for field in optional_fields:
-                if field in row and pd.notna(row[field]):
-                    item[field] = convert_to_json_compatible(row[field])
-            
-            data.append(item)
-        
-        # Save as JSON
-        print(f"Saving to JSON: {json_path}")
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Stream records straight to the output file
+        if jobs < 0:
+            jobs = os.cpu_count() or 1
+        print(f"Saving to {output_format}: {json_path}")
+        if output_format == 'json' and jobs > 1 and len(df) > _ROWS_PER_TASK:
+            count, nbytes = write_json_array_parallel(df, json_path, jobs)
+        else:
+            writers = {'json': write_json_array, 'msgpack': write_msgpack, 'parquet': write_parquet}
+            count, nbytes = writers[output_format](iter_records(df), json_path)
         
-        print(f"✓ Successfully converted {len(data)} records to JSON")
+        print(f"✓ Successfully converted {count} records to {output_format}")
         print(f"✓ Output file: {json_path}")
-        print(f"✓ File size: {Path(json_path).stat().st_size / 1024:.1f} KB")
+        print(f"✓ File size: {nbytes / 1024:.1f} KB")
         
         return True
         
@@ -100,12 +384,22 @@ Examples:
   # Convert a single file
   python convert_results_to_json.py results.pkl results.json
   
+  # Convert an LZ4-compressed pickle (output: results.json)
+  python convert_results_to_json.py results.pkl.lz4
+  
+  # Write a compact parquet file instead (output: results.parquet)
+  python convert_results_to_json.py results.pkl --format parquet
+  
   # The output JSON can then be uploaded to the SimBench web explorer
         """
     )
     
-    parser.add_argument('input_file', type=str, help='Input pickle file (.pkl)')
-    parser.add_argument('output_file', type=str, nargs='?', help='Output JSON file (.json). If not provided, will use input filename with .json extension')
+    parser.add_argument('input_file', type=str, help='Input pickle file (.pkl, optionally compressed, e.g. .pkl.lz4)')
+    parser.add_argument('output_file', type=str, nargs='?', help='Output file. If not provided, will use input filename with the extension of --format')
+    parser.add_argument('--format', choices=sorted(OUTPUT_SUFFIXES), default='json',
+                        help='Output format (default: json, the format the web explorer reads)')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Worker processes for JSON conversion; -1 uses all cores (default: 1)')
     
     args = parser.parse_args()
     
@@ -115,14 +409,19 @@ Examples:
         print(f"✗ Error: Input file not found: {args.input_file}", file=sys.stderr)
         sys.exit(1)
     
-    if not input_path.suffix == '.pkl':
+    # Strip a compression suffix so results.pkl.lz4 -> results.json
+    base_path = input_path
+    if base_path.suffix in _JOBLIB_SUFFIXES + _PANDAS_COMPRESSION_SUFFIXES:
+        base_path = base_path.with_suffix('')
+    
+    if not base_path.suffix == '.pkl':
         print(f"⚠ Warning: Input file doesn't have .pkl extension", file=sys.stderr)
     
     # Determine output file
     if args.output_file:
         output_path = Path(args.output_file)
     else:
-        output_path = input_path.with_suffix('.json')
+        output_path = base_path.with_suffix(OUTPUT_SUFFIXES[args.format])
     
     # Confirm overwrite if output exists
     if output_path.exists():
@@ -132,15 +431,16 @@ Examples:
             sys.exit(0)
     
     # Perform conversion
-    success = pickle_to_json(input_path, output_path)
+    success = pickle_to_json(input_path, output_path, args.format, args.jobs)
     
     if success:
-        print("\n" + "="*60)
-        print("Next steps:")
-        print("1. Go to the SimBench Results Explorer")
-        print("2. Upload the generated JSON file")
-        print("3. Explore your model's predictions interactively!")
-        print("="*60)
+        if args.format == 'json':
+            print("\n" + "="*60)
+            print("Next steps:")
+            print("1. Go to the SimBench Results Explorer")
+            print("2. Upload the generated JSON file")
+            print("3. Explore your model's predictions interactively!")
+            print("="*60)
         sys.exit(0)
     else:
         sys.exit(1)
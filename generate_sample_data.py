@@ -3,82 +3,126 @@
 Generate sample JSON data for testing the SimBench web explorer.
 
 Usage:
-    python generate_sample_data.py [output_file.json] [--num-questions N]
+    python generate_sample_data.py [output_file.json] [--num-questions N] [--seed S]
 """
 
 import json
-import random
 import argparse
 from pathlib import Path
 
+import numpy as np
 
-def generate_sample_data(num_questions=100):
-    """Generate sample SimBench results data."""
-    
-    datasets = [
-        'OpinionQA', 'GlobalOpinionQA', 'AfroBarometer', 'LatinoBarometro',
-        'ESS', 'ISSP', 'MoralMachine', 'Choices13k', 'ChaosNLI', 'Jester',
-        'WisdomOfCrowds', 'OSPsychMGKT', 'OSPsychBig5', 'TISP'
-    ]
-    
-    models = [
-        'GPT-4.1', 'GPT-3.5-turbo', 'Claude-3-Opus', 'Claude-3-Sonnet',
-        'Llama-3-70b', 'Llama-3-8b', 'Mistral-7b', 'Gemini-Pro'
-    ]
-    
-    subsets = ['SimBenchPop', 'SimBenchGrouped']
-    
-    countries = [
-        'United States', 'United Kingdom', 'Germany', 'France', 'Spain',
-        'Brazil', 'Mexico', 'Kenya', 'South Africa', 'Nigeria',
-        'India', 'China', 'Japan', 'Australia', 'Canada'
-    ]
-    
-    age_groups = ['18-29', '30-49', '50-64', '65+']
-    
-    question_templates = [
-        "Do you agree with the following statement: {}?",
-        "In this scenario, what would you choose: {}?",
-        "How would you rate your agreement with: {}?",
-        "Which option best describes your view on {}?",
-        "What is your opinion on the following: {}?",
-    ]
-    
-    topics = [
-        "government should regulate social media",
-        "climate change is a serious threat",
-        "economic growth should be prioritized over environmental protection",
-        "immigration benefits the country",
-        "artificial intelligence will create more jobs than it destroys",
-        "universal healthcare should be provided by the government",
-        "education should be free at all levels",
-        "death penalty is justified for serious crimes",
-        "same-sex marriage should be legal",
-        "voting should be mandatory",
-    ]
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+# Option labels indexed by number of options
+_OPTIONS = (None, None, ('A', 'B'), ('A', 'B', 'C'), ('A', 'B', 'C', 'D'), ('A', 'B', 'C', 'D', 'E'))
+
+# Rendered "(A): Sample option A" lines, also indexed by number of options
+_OPTION_LINES = tuple(
+    None if options is None else "".join(f"({opt}): Sample option {opt}\n" for opt in options)
+    for options in _OPTIONS
+)
+
+_DATASETS = (
+    'OpinionQA', 'GlobalOpinionQA', 'AfroBarometer', 'LatinoBarometro',
+    'ESS', 'ISSP', 'MoralMachine', 'Choices13k', 'ChaosNLI', 'Jester',
+    'WisdomOfCrowds', 'OSPsychMGKT', 'OSPsychBig5', 'TISP'
+)
+
+_MODELS = (
+    'GPT-4.1', 'GPT-3.5-turbo', 'Claude-3-Opus', 'Claude-3-Sonnet',
+    'Llama-3-70b', 'Llama-3-8b', 'Mistral-7b', 'Gemini-Pro'
+)
+
+_SUBSETS = ('SimBenchPop', 'SimBenchGrouped')
+
+_PROMPT_METHODS = ('token_prob', 'verbalized')
+
+_COUNTRIES = (
+    'United States', 'United Kingdom', 'Germany', 'France', 'Spain',
+    'Brazil', 'Mexico', 'Kenya', 'South Africa', 'Nigeria',
+    'India', 'China', 'Japan', 'Australia', 'Canada'
+)
+
+_AGE_GROUPS = ('18-29', '30-49', '50-64', '65+')
+
+_QUESTION_TEMPLATES = (
+    "Do you agree with the following statement: {}?",
+    "In this scenario, what would you choose: {}?",
+    "How would you rate your agreement with: {}?",
+    "Which option best describes your view on {}?",
+    "What is your opinion on the following: {}?",
+)
+
+_TOPICS = (
+    "government should regulate social media",
+    "climate change is a serious threat",
+    "economic growth should be prioritized over environmental protection",
+    "immigration benefits the country",
+    "artificial intelligence will create more jobs than it destroys",
+    "universal healthcare should be provided by the government",
+    "education should be free at all levels",
+    "death penalty is justified for serious crimes",
+    "same-sex marriage should be legal",
+    "voting should be mandatory",
+)
+
+
+def generate_sample_data(num_questions=100, seed=None):
+    """Generate sample SimBench results data.
+    
+    All random values are drawn in bulk from a single NumPy Generator
+    seeded with ``seed``, so a fixed seed reproduces the same data.
+    """
+    rng = np.random.default_rng(seed)
+    
+    # Draw every distribution up front as an (N, 5) array; columns past a
+    # question's num_options are masked out and stay zero.
+    num_options_all = rng.choice([2, 3, 4, 5], size=num_questions)
+    mask = np.arange(len(_OPTIONS[-1])) < num_options_all[:, None]
+    
+    # Generate human answer distributions
+    human = generate_distributions(rng, mask)
+    
+    # Generate model answer distributions (somewhat correlated with human)
+    model = generate_model_distributions(rng, human, mask, correlation=0.7)
+    
+    # Calculate human entropy (normalized)
+    entropies = calculate_normalized_entropy(human, num_options_all)
+    
+    # Calculate SimBench Score (higher is better, -inf to 100)
+    simbench_scores = 100 - calculate_kl_divergence(human, model) * 50
+    
+    human_rows = human.tolist()
+    model_rows = model.tolist()
+    entropies = entropies.tolist()
+    simbench_scores = simbench_scores.tolist()
+    num_options_all = num_options_all.tolist()
+    
+    # Pre-draw the remaining per-question choices as index arrays
+    template_idx = rng.integers(0, len(_QUESTION_TEMPLATES), num_questions).tolist()
+    topic_idx = rng.integers(0, len(_TOPICS), num_questions).tolist()
+    country_idx = rng.integers(0, len(_COUNTRIES), num_questions).tolist()
+    age_idx = rng.integers(0, len(_AGE_GROUPS), num_questions).tolist()
+    subset_idx = rng.integers(0, len(_SUBSETS), num_questions).tolist()
+    dataset_idx = rng.integers(0, len(_DATASETS), num_questions).tolist()
+    model_idx = rng.integers(0, len(_MODELS), num_questions).tolist()
+    prompt_method_idx = rng.integers(0, len(_PROMPT_METHODS), num_questions).tolist()
+    group_sizes = rng.integers(50, 2001, num_questions).tolist()
     
     data = []
     
     for i in range(num_questions):
         # Random question configuration
-        num_options = random.choice([2, 3, 4, 5])
-        if num_options == 2:
-            options = ['A', 'B']
-        elif num_options == 3:
-            options = ['A', 'B', 'C']
-        elif num_options == 4:
-            options = ['A', 'B', 'C', 'D']
-        else:
-            options = ['A', 'B', 'C', 'D', 'E']
+        options = _OPTIONS[num_options_all[i]]
         
-        # Generate human answer distribution
-        human_answer = generate_distribution(options)
-        
-        # Generate model answer distribution (somewhat correlated with human)
-        model_answer = generate_model_distribution(human_answer, correlation=0.7)
-        
-        # Calculate human entropy (normalized)
-        entropy = calculate_normalized_entropy(human_answer)
+        human_answer = dict(zip(options, human_rows[i]))
+        model_answer = dict(zip(options, model_rows[i]))
+        entropy = entropies[i]
+        simbench_score = simbench_scores[i]
         
         # Determine agreement category
         if entropy < 0.33:
@@ -88,24 +132,18 @@ def generate_sample_data(num_questions=100):
         else:
             agreement = 'Low'
         
-        # Calculate SimBench Score (higher is better, -inf to 100)
-        kl_div = calculate_kl_divergence(human_answer, model_answer)
-        simbench_score = 100 - kl_div * 50
-        
         # Random question text
-        template = random.choice(question_templates)
-        topic = random.choice(topics)
+        template = _QUESTION_TEMPLATES[template_idx[i]]
+        topic = _TOPICS[topic_idx[i]]
         question = template.format(topic)
         
         # Format as full question with options
-        question_with_options = f"{question}\n\nOptions:\n"
-        for opt in options:
-            question_with_options += f"({opt}): Sample option {opt}\n"
+        question_with_options = f"{question}\n\nOptions:\n{_OPTION_LINES[len(options)]}"
         
         # Random demographic
-        country = random.choice(countries)
-        age = random.choice(age_groups)
-        subset = random.choice(subsets)
+        country = _COUNTRIES[country_idx[i]]
+        age = _AGE_GROUPS[age_idx[i]]
+        subset = _SUBSETS[subset_idx[i]]
         
         # System prompt varies by subset
         if subset == 'SimBenchGrouped':
@@ -116,7 +154,7 @@ def generate_sample_data(num_questions=100):
         # Create data item
         item = {
             'index': i,
-            'dataset_name': random.choice(datasets),
+            'dataset_name': _DATASETS[dataset_idx[i]],
             'input_template': question_with_options,
             'System_Prompt': system_prompt,
             'Subset': subset,
@@ -124,10 +162,10 @@ def generate_sample_data(num_questions=100):
             'Human_Agreement': agreement,
             'human_answer': human_answer,
             'Response_Distribution': model_answer,
-            'Model': random.choice(models),
+            'Model': _MODELS[model_idx[i]],
             'SimBench_Score': round(simbench_score, 2),
-            'Prompt_Method': random.choice(['token_prob', 'verbalized']),
-            'group_size': random.randint(50, 2000)
+            'Prompt_Method': _PROMPT_METHODS[prompt_method_idx[i]],
+            'group_size': group_sizes[i]
         }
         
         data.append(item)
@@ -135,65 +173,43 @@ def generate_sample_data(num_questions=100):
     return data
 
 
-def generate_distribution(options):
-    """Generate a random probability distribution over options."""
-    # Use Dirichlet distribution for natural-looking probabilities
-    alphas = [random.uniform(0.5, 5.0) for _ in options]
-    probs = [random.random() for _ in alphas]
-    total = sum(probs)
-    probs = [p / total for p in probs]
-    
-    return {opt: prob for opt, prob in zip(options, probs)}
+def generate_distributions(rng, mask):
+    """Generate one random probability distribution per row of mask."""
+    # Dirichlet draws via normalised Gamma samples, restricted to the mask
+    alphas = rng.uniform(0.5, 5.0, size=mask.shape)
+    probs = np.where(mask, rng.gamma(alphas), 0.0)
+    return probs / probs.sum(axis=1, keepdims=True)
 
 
-def calculate_normalized_entropy(distribution):
-    """Calculate normalized entropy of a distribution (0 to 1)."""
-    import math
-    n = len(distribution)
-    if n <= 1:
-        return 0.0
-    
-    entropy = 0.0
-    for prob in distribution.values():
-        if prob > 0:
-            entropy -= prob * math.log(prob)
+def calculate_normalized_entropy(probs, num_options):
+    """Calculate normalized entropy of each row of probs (0 to 1)."""
+    # log(p) only where p > 0, then a fused multiply-and-sum per row
+    log_probs = np.log(probs, out=np.zeros_like(probs), where=probs > 0)
+    entropy = -np.einsum('ij,ij->i', probs, log_probs)
     
     # Normalize by max entropy (uniform distribution)
-    max_entropy = math.log(n)
-    return entropy / max_entropy if max_entropy > 0 else 0.0
+    max_entropy = np.log(num_options)
+    return np.divide(entropy, max_entropy, out=np.zeros_like(entropy), where=max_entropy > 0)
 
 
 def calculate_kl_divergence(p, q):
-    """Calculate KL divergence from q to p."""
-    import math
-    kl = 0.0
+    """Calculate KL divergence from q to p for each row."""
     eps = 1e-10
-    
-    for key in p:
-        p_val = p[key]
-        q_val = q.get(key, 0)
-        if p_val > 0:
-            kl += p_val * math.log((p_val + eps) / (q_val + eps))
-    
-    return max(0, kl)
+    log_ratio = np.log((p + eps) / (q + eps), out=np.zeros_like(p), where=p > 0)
+    return np.maximum(0, np.einsum('ij,ij->i', p, log_ratio))
 
 
-def generate_model_distribution(human_answer, correlation=0.7):
-    """Generate model distribution correlated with human distribution."""
-    model_answer = {}
+def generate_model_distributions(rng, human, mask, correlation=0.7):
+    """Generate model distributions correlated with the human distributions."""
+    num_options = mask.sum(axis=1, keepdims=True)
     
-    for option, human_prob in human_answer.items():
-        # Add noise to human probability
-        noise = random.gauss(0, 0.1)
-        model_prob = human_prob * correlation + (1 - correlation) * (1.0 / len(human_answer))
-        model_prob = max(0.01, min(0.99, model_prob + noise))
-        model_answer[option] = model_prob
+    # Add noise to human probability
+    noise = rng.normal(0, 0.1, size=human.shape)
+    model = human * correlation + (1 - correlation) * (1.0 / num_options)
+    model = np.where(mask, np.clip(model + noise, 0.01, 0.99), 0.0)
     
     # Normalize
-    total = sum(model_answer.values())
-    model_answer = {k: v / total for k, v in model_answer.items()}
-    
-    return model_answer
+    return model / model.sum(axis=1, keepdims=True)
 
 
 def main():
@@ -216,20 +232,31 @@ def main():
         help='Number of sample questions to generate (default: 100)'
     )
     
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for reproducible output (default: unseeded)'
+    )
+    
     args = parser.parse_args()
     
     print(f"Generating {args.num_questions} sample questions...")
-    data = generate_sample_data(args.num_questions)
+    data = generate_sample_data(args.num_questions, seed=args.seed)
     
     output_path = Path(args.output_file)
     print(f"Saving to {output_path}...")
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    with open(output_path, 'wb') as f:
+        nbytes = f.write(payload)
     
     print(f"✓ Generated {len(data)} sample questions")
     print(f"✓ Saved to {output_path}")
-    print(f"✓ File size: {output_path.stat().st_size / 1024:.1f} KB")
+    print(f"✓ File size: {nbytes / 1024:.1f} KB")
     print("\nYou can now upload this file to the SimBench Results Explorer!")
 
 
@@ -7,6 +7,13 @@ the JSON schema expected by the website explorer.
 Usage:
   python process_simbench_results.py --input path/to/results.pkl --output website/data/results.json
 
+Input may be a pickle, parquet or CSV file; only the columns the converter
+uses are loaded (for parquet, the others are never read from disk).
+
+The website reads JSON, which is the default. --format parquet or arrow
+writes the same records as a columnar file instead (needs pyarrow); nested
+fields such as human_answer are stored there as JSON text columns.
+
 This script attempts to be robust to small schema differences:
 - Detects Response_Distribution as a dict or a list and maps indices to labels.
 - Detects human_answer as counts (sum>1) or probabilities and normalizes to probabilities.
@@ -15,19 +22,108 @@ This script attempts to be robust to small schema differences:
 """
 
 import argparse
+import functools
 import json
 import math
+import multiprocessing
+import os
+import re
+import threading
 from pathlib import Path
 from typing import Any, Dict, List
 
 import pandas as pd
 import numpy as np
 
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+
+# "(A): option text" entries in an input_template, up to the next option or end
+_OPTION_RE = re.compile(r'\(([A-Z])\):\s*([^\n(]+?)(?=\s*\([A-Z]\):|$)', re.MULTILINE | re.DOTALL)
+
+# Default option labels A, B, C... indexed by number of options
+_DEFAULT_LABELS = {n: tuple(chr(65 + i) for i in range(n)) for n in range(1, 27)}
+
+# Every input column process_row() reads, including alternative spellings
+NEEDED_COLS = [
+    'dataset_name', 'dataset', 'input_template', 'prompt',
+    'group_prompt_template', 'group_prompt_variable_map', 'group_size',
+    'Model', 'model', 'Model_Name', 'Prompt_Method', 'prompt_method',
+    'System_Prompt', 'system_prompt', 'System_prompt', 'SystemPrompt',
+    'Subset', 'subset', 'depth', 'Human_Normalized_Entropy',
+    'answer_options', 'auxiliary', 'Num_Options', 'Num_Choices',
+    'human_answer', 'Human_Distribution',
+    'Predicted_Distribution', 'Response_Distribution', 'Model_Distribution',
+    'SimBench_Score', 'TV_rescaled', 'Total_Variation',
+    'Sum_of_Probs', 'User_Prompt', 'input_variable_map',
+]
+
+# Position of each NEEDED_COLS name within the row tuples process_row() gets
+_COL_IDX = {c: i for i, c in enumerate(NEEDED_COLS)}
+
+# Fields read as `a or b or ...` over alternative column spellings
+_FIELD_ALIASES = {
+    'input_template': ('input_template', 'prompt'),
+    'Model': ('Model', 'model', 'Model_Name'),
+    'Prompt_Method': ('Prompt_Method', 'prompt_method'),
+    'System_Prompt': ('System_Prompt', 'system_prompt', 'System_prompt', 'SystemPrompt'),
+    'Subset': ('Subset', 'subset'),
+    'Num_Options': ('Num_Options', 'Num_Choices'),
+}
+
+# Candidate columns identifying a question for --sample, in preference order
+USER_PROMPT_COLS = ['User_Prompt', 'user_prompt', 'input_template', 'prompt']
+SYSTEM_PROMPT_COLS = ['System_Prompt', 'system_prompt', 'SystemPrompt']
+
+# Every column worth loading from the input file
+LOAD_COLS = list(dict.fromkeys(NEEDED_COLS + USER_PROMPT_COLS + SYSTEM_PROMPT_COLS))
+
+
+def read_parquet_columns(path: Path, columns: List[str]) -> pd.DataFrame:
+    """Read only the given columns (those that exist) from a parquet file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    names = set(pq.read_schema(path).names)
+    table = pq.read_table(path, columns=[c for c in columns if c in names])
+    df = table.to_pandas()
+    # Nested cells come back as ndarrays (lists, and lists inside structs) or
+    # lists of (key, value) tuples (maps); process_row expects plain lists
+    # and dicts, so rebuild every nested column as Python objects
+    for field in table.schema:
+        if pa.types.is_nested(field.type):
+            values = table.column(field.name).to_pylist(maps_as_pydicts='lossy')
+            df[field.name] = pd.Series(values, index=df.index, dtype=object)
+    return df
+
 
 def is_null_or_na(x):
     """Safely check if value is null/NA, handling arrays."""
     if x is None:
         return True
+    # Fast paths for the common types, avoiding pd.isna's dispatch and the
+    # exception-driven fallback below
+    t = type(x)
+    if t is str or t is int or t is bool or t is dict:
+        return False
+    if isinstance(x, float):
+        return x != x
+    if t is list:
+        # same answer as the pd.isna path below: NA if every element is NA
+        # (None, pd.NA or NaN); other element types defer to that path
+        for v in x:
+            tv = type(v)
+            if tv is str or tv is int or tv is bool:
+                return False
+            if tv is float:
+                if v == v:
+                    return False
+            elif v is not None and v is not pd.NA:
+                break
+        else:
+            return True
     try:
         # For scalars and compatible types
         if pd.isna(x):
@@ -43,17 +139,20 @@ def is_null_or_na(x):
 
 
 def safe_to_list(x):
+    # Dispatch on type; only strings that can be a JSON array are parsed, so
+    # ordinary label strings never go through json.loads and its exception
     if is_null_or_na(x):
         return None
     if isinstance(x, list):
         return x
-    if isinstance(x, (str,)):
+    if isinstance(x, np.ndarray):
+        return x.tolist()
+    if isinstance(x, str) and x.lstrip().startswith('['):
         try:
             v = json.loads(x)
-            if isinstance(v, list):
-                return v
-        except Exception:
+        except ValueError:
             return None
+        return v if isinstance(v, list) else None
     return None
 
 
@@ -61,13 +160,58 @@ def normalize_prob_dict(d: Dict[str, float]) -> Dict[str, float]:
     # ensure non-negative and sum to 1 (if total>0)
     if not d:
         return {}
-    cleaned = {k: max(0.0, float(v) if v is not None else 0.0) for k, v in d.items()}
-    s = sum(cleaned.values())
-    if s <= 0:
+    keys = list(d)
+    a = np.fromiter((0.0 if v is None else v for v in d.values()), dtype=np.float64, count=len(keys))
+    # fmax rather than clip so NaN counts as 0, as max(0.0, nan) did
+    np.fmax(a, 0.0, out=a)
+    s = a.sum()
+    if s > 0:
+        a /= s
+    else:
         # fallback to uniform
-        n = len(cleaned) or 1
-        return {k: 1.0 / n for k in cleaned}
-    return {k: v / s for k, v in cleaned.items()}
+        a.fill(1.0 / len(a))
+    return dict(zip(keys, a.tolist()))
+
+
+# Record fields holding the aligned distributions normalize_distributions() finishes
+_DISTRIBUTION_FIELDS = ('human_answer', 'Response_Distribution')
+
+
+def normalize_distributions(records: List[Dict[str, Any]]) -> None:
+    """
+    Clip at zero and normalize every record's distributions, in place.
+
+    All distributions of the batch are packed into one flat array and
+    normalized together (sums via bincount over the owning distribution)
+    instead of one small NumPy call per dict. A distribution that sums to
+    zero becomes uniform.
+    """
+    dists = [(rec, field) for rec in records for field in _DISTRIBUTION_FIELDS]
+    if not dists:
+        return
+    lengths = np.fromiter((len(rec[field]) for rec, field in dists), dtype=np.intp, count=len(dists))
+    values = np.fromiter(
+        (v for rec, field in dists for v in rec[field].values()),
+        dtype=np.float64, count=int(lengths.sum()))
+    np.clip(values, 0.0, None, out=values)
+    owner = np.repeat(np.arange(len(dists)), lengths)
+    sums = np.bincount(owner, weights=values, minlength=len(dists))
+    ok = sums > 0
+    values = np.where(ok[owner],
+                      values / np.where(ok, sums, 1.0)[owner],
+                      1.0 / lengths[owner])
+
+    flat = values.tolist()
+    pos = 0
+    for (rec, field), n in zip(dists, lengths.tolist()):
+        rec[field] = dict(zip(rec[field], flat[pos:pos + n]))
+        pos += n
+
+
+def default_labels(n: int) -> List[str]:
+    # A, B, C... for n options; past Z the characters simply continue
+    labels = _DEFAULT_LABELS.get(n)
+    return list(labels) if labels is not None else [chr(65 + i) for i in range(n)]
 
 
 def list_to_label_dict(lst: List[float], labels: List[str]) -> Dict[str, float]:
@@ -81,6 +225,21 @@ def list_to_label_dict(lst: List[float], labels: List[str]) -> Dict[str, float]:
     return normalize_prob_dict(d)
 
 
+@functools.lru_cache(maxsize=100000)
+def _parse_aux_text(text: str) -> Any:
+    return json.loads(text)
+
+
+def parse_aux(aux: Any) -> Any:
+    """
+    Return an auxiliary value with JSON text parsed (raises on invalid JSON).
+
+    auxiliary strings repeat across all rows of a question, so parses are
+    memoized by value. The parsed objects are shared; do not mutate them.
+    """
+    return _parse_aux_text(aux) if isinstance(aux, str) else aux
+
+
 def infer_labels_from_aux(aux: Any) -> List[str]:
     # auxiliary may contain answer options or the correct answer value; try some heuristics
     if isinstance(aux, dict):
@@ -107,35 +266,160 @@ def calculate_entropy_category(entropy_value: float) -> str:
         return 'Low'
 
 
-def process_row(row: pd.Series) -> Dict[str, Any]:
+# Per-question label inference results, keyed on the inputs that determine
+# them; evicted oldest-first once _LABEL_CACHE_SIZE entries are held
+_LABEL_CACHE: Dict[tuple, tuple] = {}
+_LABEL_CACHE_SIZE = 100000
+
+
+def _cache_key_part(value: Any) -> Any:
+    # lists (the usual answer_options form) are keyed by their contents
+    return tuple(value) if isinstance(value, list) else value
+
+
+def get_labels_and_options(template: Any, ao: Any, aux: Any, num_options: Any):
+    """
+    Return (labels, option_texts) for a question.
+
+    The same question repeats once per Model x Prompt_Method, so results are
+    memoized on (template, answer_options, auxiliary, num_options). Inputs
+    that cannot be hashed (e.g. a dict auxiliary) are simply not cached.
+    The returned lists are shared between rows and must not be mutated.
+    """
+    # Every row's NaN is a distinct object that never compares equal, so NA
+    # inputs become None to let rows share a cache entry
+    template, ao, aux, num_options = (
+        None if is_null_or_na(v) else v for v in (template, ao, aux, num_options))
+    key = (template, _cache_key_part(ao), _cache_key_part(aux), num_options)
+    try:
+        cached = _LABEL_CACHE.get(key)
+    except TypeError:
+        return _infer_labels_and_options(template, ao, aux, num_options)
+    if cached is None:
+        cached = _infer_labels_and_options(template, ao, aux, num_options)
+        if len(_LABEL_CACHE) >= _LABEL_CACHE_SIZE:
+            del _LABEL_CACHE[next(iter(_LABEL_CACHE))]
+        _LABEL_CACHE[key] = cached
+    return cached
+
+
+def _infer_labels_and_options(template: Any, ao: Any, aux: Any, num_options: Any):
+    # Uncached worker behind get_labels_and_options()
+    labels = []
+    option_texts = []
+    
+    # First check if answer_options column exists
+    if not is_null_or_na(ao):
+        if isinstance(ao, list):
+            labels = [str(x) for x in ao]
+            # If answer_options contains the full text, use it
+            # Otherwise we'll extract from input_template below
+            if labels and not any(len(x) == 1 for x in labels):
+                option_texts = labels
+                # Extract just the letters for labels
+                labels = default_labels(len(option_texts))
+        else:
+            try:
+                parsed = [str(x) for x in json.loads(ao)]
+                labels = parsed
+                if labels and not any(len(x) == 1 for x in labels):
+                    option_texts = labels
+                    labels = default_labels(len(option_texts))
+            except Exception:
+                labels = []
+    
+    # Try to infer from input_template (count (A), (B), (C), (D) patterns)
+    # Also extract the option text that follows the letter
+    if not labels or not option_texts:
+        if not is_null_or_na(template):
+            template = str(template)
+            # Extract both letter and text: (A): Some text
+            matches = _OPTION_RE.findall(template)
+            if matches:
+                if not labels:
+                    labels = [m[0] for m in matches]
+                if not option_texts:
+                    option_texts = [m[1].strip() for m in matches]
+
+    # check auxiliary field
+    if not labels:
+        if not is_null_or_na(aux):
+            try:
+                labels = infer_labels_from_aux(parse_aux(aux))
+            except Exception:
+                labels = []
+
+    # default simple labels A,B,C...
+    if not labels:
+        labels = default_labels(int(num_options or 4))
+
+    return labels, option_texts
+
+
+def resolve_aliases(present: frozenset) -> Dict[str, tuple]:
+    """
+    Map each _FIELD_ALIASES field to the row positions worth trying.
+
+    Only the input's present columns are kept, so absent spellings are never
+    looked at per row. The last spelling is always kept: when every alias is
+    falsy the chain's result is that column's value (None if absent).
+    """
+    aliases = {}
+    for field, names in _FIELD_ALIASES.items():
+        kept = [n for n in names[:-1] if n in present] + [names[-1]]
+        aliases[field] = tuple(_COL_IDX[n] for n in kept)
+    return aliases
+
+
+def process_row(row: tuple, present: frozenset, aliases: Dict[str, tuple]) -> Dict[str, Any]:
+    """
+    Build the website record for one row.
+
+    row is a plain tuple of the row's NEEDED_COLS values, positioned as in
+    _COL_IDX (None for columns the input lacks); present holds the names the
+    input really has, and aliases comes from resolve_aliases(present). The
+    distributions come back aligned to the labels but not yet normalized;
+    see normalize_distributions().
+    """
+    def get(name):
+        return row[_COL_IDX[name]]
+
+    def first(field):
+        # `a or b or ...` over the field's alias columns
+        for pos in aliases[field]:
+            val = row[pos]
+            if val:
+                break
+        return val
+
     # Columns we definitely want in the website JSON
     out: Dict[str, Any] = {}
-    out['dataset_name'] = row.get('dataset_name') if 'dataset_name' in row else row.get('dataset')
-    out['input_template'] = row.get('input_template') or row.get('prompt') or ''
-    out['group_prompt_template'] = row.get('group_prompt_template') or ''
-    out['group_prompt_variable_map'] = row.get('group_prompt_variable_map') or {}
+    out['dataset_name'] = get('dataset_name') if 'dataset_name' in present else get('dataset')
+    out['input_template'] = first('input_template') or ''
+    out['group_prompt_template'] = get('group_prompt_template') or ''
+    out['group_prompt_variable_map'] = get('group_prompt_variable_map') or {}
     
     # Safely get group_size
-    gs = row.get('group_size')
+    gs = get('group_size')
     try:
         out['group_size'] = int(gs) if not is_null_or_na(gs) else None
     except (ValueError, TypeError):
         out['group_size'] = None
     
-    out['Model'] = row.get('Model') or row.get('model') or row.get('Model_Name')
-    out['Prompt_Method'] = row.get('Prompt_Method') or row.get('prompt_method')
+    out['Model'] = first('Model')
+    out['Prompt_Method'] = first('Prompt_Method')
     
     # System Prompt (NEW - important for transparency)
     # Check multiple possible field names
-    system_prompt = row.get('System_Prompt') or row.get('system_prompt') or row.get('System_prompt') or row.get('SystemPrompt')
+    system_prompt = first('System_Prompt')
     out['System_Prompt'] = str(system_prompt) if not is_null_or_na(system_prompt) else ''
     
     # Subset field (NEW - SimBenchPop vs SimBenchGrouped)
     # First try direct Subset field, then derive from depth
-    subset = row.get('Subset') or row.get('subset')
+    subset = first('Subset')
     if is_null_or_na(subset) or subset == '':
         # Try to derive from depth field
-        depth_val = row.get('depth')
+        depth_val = get('depth')
         if not is_null_or_na(depth_val):
             try:
                 depth_int = int(depth_val)
@@ -151,7 +435,7 @@ def process_row(row: pd.Series) -> Dict[str, Any]:
     out['Subset'] = str(subset) if subset else ''
     
     # Human Normalized Entropy (NEW - for agreement filtering)
-    entropy_val = row.get('Human_Normalized_Entropy')
+    entropy_val = get('Human_Normalized_Entropy')
     if not is_null_or_na(entropy_val):
         try:
             entropy_val = float(entropy_val)
@@ -164,76 +448,19 @@ def process_row(row: pd.Series) -> Dict[str, Any]:
         out['Human_Normalized_Entropy'] = None
         out['Human_Agreement'] = 'Unknown'
 
-    # Try to find answer option labels and their text
-    labels = []
-    option_texts = []
-    
-    # First check if answer_options column exists
-    ao = row.get('answer_options')
-    if not is_null_or_na(ao):
-        if isinstance(ao, list):
-            labels = [str(x) for x in ao]
-            # If answer_options contains the full text, use it
-            # Otherwise we'll extract from input_template below
-            if labels and not any(len(x) == 1 for x in labels):
-                option_texts = labels
-                # Extract just the letters for labels
-                labels = [chr(ord('A') + i) for i in range(len(option_texts))]
-        else:
-            try:
-                parsed = [str(x) for x in json.loads(ao)]
-                labels = parsed
-                if labels and not any(len(x) == 1 for x in labels):
-                    option_texts = labels
-                    labels = [chr(ord('A') + i) for i in range(len(option_texts))]
-            except Exception:
-                labels = []
-    
-    # Try to infer from input_template (count (A), (B), (C), (D) patterns)
-    # Also extract the option text that follows the letter
-    if not labels or not option_texts:
-        template = row.get('input_template')
-        if not is_null_or_na(template):
-            template = str(template)
-            # Extract both letter and text: (A): Some text
-            import re
-            # Pattern matches (A): text up to next option or end
-            option_pattern = r'\(([A-Z])\):\s*([^\n(]+?)(?=\s*\([A-Z]\):|$)'
-            matches = re.findall(option_pattern, template, re.MULTILINE | re.DOTALL)
-            if matches:
-                if not labels:
-                    labels = [m[0] for m in matches]
-                if not option_texts:
-                    option_texts = [m[1].strip() for m in matches]
-
-    # check auxiliary field
-    if not labels:
-        aux = row.get('auxiliary')
-        if not is_null_or_na(aux):
-            try:
-                if isinstance(aux, str):
-                    aux = json.loads(aux)
-                labels = infer_labels_from_aux(aux)
-            except Exception:
-                labels = []
-
-    # default simple labels A,B,C...
-    if not labels:
-        labels = [chr(ord('A') + i) for i in range(int(row.get('Num_Options') or row.get('Num_Choices') or 4))]
+    # Answer option labels and their text, shared by every row of a question
+    labels, option_texts = get_labels_and_options(
+        get('input_template'), get('answer_options'), get('auxiliary'),
+        first('Num_Options'))
 
     # Human answer: may be dict-like, list-like, or counts
     # NEW: Always normalize to ensure it's a probability distribution
     human = {}
-    ha = row.get('human_answer')
+    ha = get('human_answer')
     if not is_null_or_na(ha):
         if isinstance(ha, dict):
-            # If sum >> 1, these are counts, normalize them
-            total = sum(ha.values())
-            if total > 1.5:  # Assume counts if sum significantly > 1
-                human = normalize_prob_dict(ha)
-            else:
-                # Already probabilities, just ensure normalized
-                human = normalize_prob_dict(ha)
+            # counts or probabilities alike: normalizing handles both
+            human = normalize_prob_dict(ha)
         else:
             # try parse string or list
             lst = safe_to_list(ha)
@@ -259,8 +486,8 @@ def process_row(row: pd.Series) -> Dict[str, Any]:
     model_dist = {}
     rd_field = None
     
-    pd_val = row.get('Predicted_Distribution')
-    rd_val = row.get('Response_Distribution')
+    pd_val = get('Predicted_Distribution')
+    rd_val = get('Response_Distribution')
     
     if not is_null_or_na(pd_val):
         rd_field = pd_val
@@ -290,24 +517,24 @@ def process_row(row: pd.Series) -> Dict[str, Any]:
 
     # If human or model empty, try to convert Human_Distribution/Model_Distribution etc.
     if not human:
-        hd_val = row.get('Human_Distribution')
+        hd_val = get('Human_Distribution')
         if not is_null_or_na(hd_val):
             human = normalize_prob_dict(hd_val)
     if not model_dist:
-        md_val = row.get('Model_Distribution')
+        md_val = get('Model_Distribution')
         if not is_null_or_na(md_val):
             model_dist = normalize_prob_dict(md_val)
 
-    # Ensure both have same keys: union of labels
-    union_keys = list(dict.fromkeys(list(labels) + list(human.keys()) + list(model_dist.keys())))
+    # Ensure both have same keys: union of labels. Usually both dicts are
+    # keyed by (a subset of) the distinct labels, so the union is just labels
+    lab_set = frozenset(labels)
+    if len(lab_set) == len(labels) and lab_set.issuperset(human) and lab_set.issuperset(model_dist):
+        union_keys = list(labels)
+    else:
+        union_keys = list(dict.fromkeys(list(labels) + list(human.keys()) + list(model_dist.keys())))
     # Fill missing keys with zero then normalize
-    human_full = {k: human.get(k, 0.0) for k in union_keys}
-    model_full = {k: model_dist.get(k, 0.0) for k in union_keys}
-    human_full = normalize_prob_dict(human_full)
-    model_full = normalize_prob_dict(model_full)
-
-    out['human_answer'] = human_full
-    out['Response_Distribution'] = model_full
+    out['human_answer'] = {k: human.get(k, 0.0) for k in union_keys}
+    out['Response_Distribution'] = {k: model_dist.get(k, 0.0) for k in union_keys}
     
     # Store answer_options for display in the UI
     # Use extracted option texts if available, otherwise use labels
@@ -317,7 +544,7 @@ def process_row(row: pd.Series) -> Dict[str, Any]:
         out['answer_options'] = union_keys
 
     # Map depth to split name if present (and update Subset if it's empty)
-    depth_val = row.get('depth')
+    depth_val = get('depth')
     if not is_null_or_na(depth_val):
         try:
             depth_map = {0: 'SimBenchPop', 1: 'SimBenchGrouped'}
@@ -332,7 +559,7 @@ def process_row(row: pd.Series) -> Dict[str, Any]:
 
     # SimBench score: NEW - Handle range from -inf to 100
     # Try multiple column names in order of preference
-    score_val = row.get('SimBench_Score')
+    score_val = get('SimBench_Score')
     if not is_null_or_na(score_val):
         try:
             out['SimBench_Score'] = float(score_val)
@@ -340,14 +567,14 @@ def process_row(row: pd.Series) -> Dict[str, Any]:
             score_val = None
     
     if score_val is None or is_null_or_na(score_val):
-        tv_val = row.get('TV_rescaled')
+        tv_val = get('TV_rescaled')
         if not is_null_or_na(tv_val):
             try:
                 out['SimBench_Score'] = float(tv_val)
             except (ValueError, TypeError):
                 pass
         else:
-            tot_var = row.get('Total_Variation')
+            tot_var = get('Total_Variation')
             if not is_null_or_na(tot_var):
                 try:
                     out['SimBench_Score'] = float(tot_var)
@@ -357,47 +584,196 @@ def process_row(row: pd.Series) -> Dict[str, Any]:
                 out['SimBench_Score'] = None
 
     # Keep original helpful fields
-    aux_val = row.get('auxiliary')
+    aux_val = get('auxiliary')
     if not is_null_or_na(aux_val):
         try:
-            aux = aux_val
-            if isinstance(aux, str):
-                aux = json.loads(aux)
-            out['auxiliary'] = aux
+            out['auxiliary'] = parse_aux(aux_val)
         except Exception:
             out['auxiliary'] = aux_val
 
     # copy any other interesting fields (Model, Prompt_Method already present)
     for col in ['Sum_of_Probs', 'User_Prompt', 'input_variable_map']:
-        val = row.get(col)
+        val = get(col)
         if not is_null_or_na(val):
             out[col] = val
 
     return out
 
 
+def _nan_to_none(obj: Any) -> Any:
+    # Stdlib-encoder prep: NaN becomes None (JSON null, as orjson writes it)
+    # and NumPy values plain Python ones, recursing into dicts and lists
+    if isinstance(obj, float):
+        return None if obj != obj else obj
+    if isinstance(obj, dict):
+        return {k: _nan_to_none(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_nan_to_none(v) for v in obj]
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return _nan_to_none(obj.tolist())
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    return obj
+
+
+def _orjson_default(obj: Any) -> Any:
+    # Values orjson does not serialise natively, mapped as _nan_to_none does
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def encode_record(rec: Dict[str, Any]) -> bytes:
+    """Encode one output record as indented UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(
+            rec,
+            default=_orjson_default,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return json.dumps(_nan_to_none(rec), indent=2, ensure_ascii=False).encode('utf8')
+
+
+# Output record fields that hold nested values; the columnar formats store
+# them as JSON text so every row has the same column type
+_JSON_TEXT_FIELDS = (
+    'group_prompt_variable_map', 'human_answer', 'Response_Distribution',
+    'answer_options', 'auxiliary', 'input_variable_map',
+)
+
+
+def encode_json_text(value: Any) -> str:
+    """Encode a nested value as compact JSON text."""
+    if orjson is not None:
+        return orjson.dumps(
+            value, default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        ).decode('utf8')
+    return json.dumps(_nan_to_none(value), ensure_ascii=False)
+
+
+def encode_table(records: List[Dict[str, Any]], output_format: str):
+    """
+    Encode output records as a parquet ('parquet') or Arrow IPC ('arrow') file.
+
+    The table is built column-wise. A scalar column pyarrow cannot give a
+    single type (e.g. mixed ints and strings) falls back to JSON text too.
+    Returns the encoded file as a pyarrow Buffer.
+    """
+    import pyarrow as pa
+
+    names = list(dict.fromkeys(k for rec in records for k in rec))
+    columns = {}
+    for name in names:
+        values = [rec.get(name) for rec in records]
+        if name not in _JSON_TEXT_FIELDS:
+            try:
+                columns[name] = pa.array(values, from_pandas=True)
+                continue
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                pass
+        columns[name] = pa.array(
+            [None if v is None else encode_json_text(v) for v in values], pa.string())
+    table = pa.table(columns)
+
+    sink = pa.BufferOutputStream()
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink, compression='zstd')
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+
+# Rows per block handed to process_chunk(); also the progress-report interval
+_ROWS_PER_TASK = 10000
+
+# Buffer size for the output file; records are written in many small pieces
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def process_chunk(task):
+    """
+    Process one contiguous block of rows.
+
+    task is (cols, present, start) where cols holds the block's column slices,
+    present the input's real columns and start the block's first row
+    position. Pure and picklable, so it can run in a worker process. Returns
+    (records, failures), failures being (row position, error message) pairs.
+    """
+    cols, present, start = task
+    aliases = resolve_aliases(present)
+    records = []
+    failures = []
+    # zip the columns into plain per-row tuples in _COL_IDX order
+    rows = zip(*(cols[c] for c in NEEDED_COLS))
+    for i, row in enumerate(rows, start):
+        try:
+            records.append(process_row(row, present, aliases))
+        except Exception as e:
+            failures.append((i, str(e)))
+    normalize_distributions(records)
+    return records, failures
+
+
+# The input's column arrays, set in each worker by _init_block_worker() so
+# tasks only need to carry a block's start row
+_BLOCK_COLS: Dict[str, np.ndarray] = {}
+_BLOCK_PRESENT: frozenset = frozenset()
+
+
+def _init_block_worker(cols: Dict[str, np.ndarray], present: frozenset) -> None:
+    global _BLOCK_COLS, _BLOCK_PRESENT
+    _BLOCK_COLS, _BLOCK_PRESENT = cols, present
+
+
+def _process_block(start: int):
+    """Run process_chunk() on the _ROWS_PER_TASK rows from position start."""
+    block = {c: a[start:start + _ROWS_PER_TASK] for c, a in _BLOCK_COLS.items()}
+    return process_chunk((block, _BLOCK_PRESENT, start))
+
+
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--input', '-i', required=True, help='Path to input pickle/csv')
+    parser.add_argument('--input', '-i', required=True, help='Path to input pickle/parquet/csv')
     parser.add_argument('--output', '-o', required=True, help='Path to output JSON file')
+    parser.add_argument('--format', '-f', choices=['json', 'parquet', 'arrow'], default='json',
+                       help='Output format (default: json, the format the website reads)')
     parser.add_argument('--sample', '-s', type=int, default=None, 
                        help='Randomly sample N rows (useful for large datasets)')
     parser.add_argument('--max-rows', '-m', type=int, default=None,
                        help='Maximum number of rows to process (takes first N rows)')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Worker processes for row processing; -1 uses all cores (default: 1)')
     args = parser.parse_args()
 
     inp = Path(args.input)
     if not inp.exists():
         print('Input file not found:', inp)
         return
+    if args.format != 'json':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print(f'--format {args.format} needs the pyarrow package')
+            return
 
-    # load with pandas
+    # load with pandas, keeping only the columns we use
     if inp.suffix in ['.pkl', '.pickle']:
         df = pd.read_pickle(inp)
+        df = df.loc[:, df.columns.intersection(LOAD_COLS)]
+    elif inp.suffix == '.parquet':
+        # columnar format: unused columns are never read from disk
+        df = read_parquet_columns(inp, LOAD_COLS)
     else:
         # try CSV/TSV
         try:
-            df = pd.read_csv(inp)
+            df = pd.read_csv(inp, usecols=lambda c: c in LOAD_COLS)
         except Exception as e:
             print('Could not read input file as CSV or pickle:', e)
             return
@@ -411,20 +787,22 @@ def main():
         # Identify unique question combinations (User_Prompt + System_Prompt)
         # Try different field name variations
         user_prompt_col = None
-        for col in ['User_Prompt', 'user_prompt', 'input_template', 'prompt']:
+        for col in USER_PROMPT_COLS:
             if col in df.columns:
                 user_prompt_col = col
                 break
         
         system_prompt_col = None
-        for col in ['System_Prompt', 'system_prompt', 'SystemPrompt']:
+        for col in SYSTEM_PROMPT_COLS:
             if col in df.columns:
                 system_prompt_col = col
                 break
         
         if user_prompt_col and system_prompt_col:
-            # Create a unique question identifier
-            df['_question_id'] = df[user_prompt_col].astype(str) + '|||' + df[system_prompt_col].astype(str)
+            # Create a unique question identifier: a uint64 hash of the two
+            # prompt columns rather than a concatenated copy of both strings
+            df['_question_id'] = pd.util.hash_pandas_object(
+                df[[user_prompt_col, system_prompt_col]], index=False).to_numpy()
             
             # Get unique question IDs
             unique_questions = df['_question_id'].unique()
@@ -432,7 +810,11 @@ def main():
             
             # Sample questions (not individual rows)
             n_questions_to_sample = min(args.sample, len(unique_questions))
-            sampled_questions = np.random.choice(unique_questions, size=n_questions_to_sample, replace=False)
+            # (seeded like the row-sampling fallback below; shuffle=False skips
+            # permuting the sample, which only the membership test uses)
+            rng = np.random.default_rng(42)
+            sampled_questions = rng.choice(unique_questions, size=n_questions_to_sample,
+                                           replace=False, shuffle=False)
             
             # Keep all rows that match the sampled questions (across all models)
             df = df[df['_question_id'].isin(sampled_questions)]
@@ -449,36 +831,97 @@ def main():
         print(f"📊 Taking first {args.max_rows:,} rows from {original_rows:,} total rows...")
         df = df.head(args.max_rows)
     
-    records = []
     total_rows = len(df)
     print(f"Processing {total_rows:,} rows...")
     
+    # Pull each needed column out once as an object array; process_row then
+    # indexes by position instead of building a pd.Series per row. Which
+    # columns exist is settled here once: absent ones share an all-None array.
+    present = frozenset(df.columns.intersection(NEEDED_COLS))
+    missing = np.full(total_rows, None, dtype=object)
+    cols = {c: df[c].to_numpy(dtype=object) if c in present else missing for c in NEEDED_COLS}
+    row_labels = df.index
+    
+    # Rows are independent, so blocks of them can be processed in parallel;
+    # imap() still returns the blocks in input order. Workers get the column
+    # arrays once at startup, so a task is just a block's start row.
+    stop = threading.Event()
+
+    def iter_starts():
+        for start in range(0, total_rows, _ROWS_PER_TASK):
+            # the pool's feeder thread runs this; once stop is set it must end,
+            # or it can block the pool's shutdown sending tasks to dead workers
+            if stop.is_set():
+                return
+            yield start
+
+    jobs = args.jobs
+    if jobs < 0:
+        jobs = os.cpu_count() or 1
+    if jobs > 1:
+        pool = multiprocessing.Pool(jobs, initializer=_init_block_worker, initargs=(cols, present))
+        results = pool.imap(_process_block, iter_starts())
+    else:
+        pool = None
+        _init_block_worker(cols, present)
+        results = map(_process_block, iter_starts())
+    
+    # Stream records into the output JSON array as blocks complete, so the
+    # full record list is never held in memory. The columnar formats are
+    # built column-wise, so for those the records are collected first.
+    outp = Path(args.output)
+    outp.parent.mkdir(parents=True, exist_ok=True)
+    
     failed_count = 0
-    for idx, row in df.iterrows():
-        try:
-            rec = process_row(row)
-            records.append(rec)
-            
-            # Progress reporting for large datasets
-            if (idx + 1) % 10000 == 0:
-                print(f"  Processed {idx + 1:,}/{total_rows:,} rows ({(idx+1)/total_rows*100:.1f}%)")
-        except Exception as e:
-            failed_count += 1
-            if failed_count <= 10:  # Only show first 10 errors
-                print(f'Warning: failed to process row {idx}: {e}')
-            elif failed_count == 11:
-                print(f'  ... suppressing further error messages ...')
+    written = 0
+    nbytes = 0
+    done = 0
+    records = []
+    completed = False
+    try:
+        with open(outp, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+            if args.format == 'json':
+                nbytes += f.write(b'[')
+            for chunk_records, failures in results:
+                if args.format == 'json':
+                    for rec in chunk_records:
+                        nbytes += f.write(b'\n' if written == 0 else b',\n')
+                        nbytes += f.write(encode_record(rec))
+                        written += 1
+                else:
+                    records.extend(chunk_records)
+                    written += len(chunk_records)
+                for pos, err in failures:
+                    failed_count += 1
+                    if failed_count <= 10:  # Only show first 10 errors
+                        print(f'Warning: failed to process row {row_labels[pos]}: {err}')
+                    elif failed_count == 11:
+                        print(f'  ... suppressing further error messages ...')
+
+                # Progress reporting for large datasets
+                done += len(chunk_records) + len(failures)
+                if done % _ROWS_PER_TASK == 0:
+                    print(f"  Processed {done:,}/{total_rows:,} rows ({done/total_rows*100:.1f}%)")
+            if args.format == 'json':
+                nbytes += f.write(b'\n]\n' if written else b']\n')
+            else:
+                nbytes += f.write(encode_table(records, args.format))
+        completed = True
+    finally:
+        if pool:
+            if completed:
+                pool.close()
+            else:
+                # an error or Ctrl-C: don't wait for blocks nobody will consume
+                stop.set()
+                pool.terminate()
+            pool.join()
 
     if failed_count > 0:
         print(f"\n⚠️  {failed_count} rows failed to process (out of {total_rows})")
-        print(f"✓  Successfully processed {len(records)} rows")
-
-    outp = Path(args.output)
-    outp.parent.mkdir(parents=True, exist_ok=True)
-    with open(outp, 'w', encoding='utf8') as f:
-        json.dump(records, f, indent=2, ensure_ascii=False)
+        print(f"✓  Successfully processed {written} rows")
 
-    print(f'Wrote {len(records)} records to {outp} (size: {outp.stat().st_size} bytes)')
+    print(f'Wrote {written} records to {outp} (size: {nbytes} bytes)')
 
 
 if __name__ == '__main__':
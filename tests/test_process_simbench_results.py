@@ -0,0 +1,51 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import process_simbench_results
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+@unittest.skipIf(pa is None, 'pyarrow is not installed')
+class ParquetNestedColumnsTest(unittest.TestCase):
+    def test_struct_and_map_columns(self):
+        table = pa.table({
+            'dataset_name': ['d', 'd'],
+            'input_template': ['Q1?', 'Q2?'],
+            'auxiliary': pa.array(
+                [{'options': ['P', 'Q']}, {'options': ['P', 'Q']}],
+                pa.struct([('options', pa.list_(pa.string()))])),
+            'human_answer': pa.array(
+                [[('P', 1.0), ('Q', 3.0)], [('P', 2.0), ('Q', 2.0)]],
+                pa.map_(pa.string(), pa.float64())),
+            'Response_Distribution': pa.array([[0.25, 0.75], [0.5, 0.5]]),
+        })
+        with tempfile.TemporaryDirectory() as tmp:
+            inp = Path(tmp) / 'in.parquet'
+            outp = Path(tmp) / 'out.json'
+            pq.write_table(table, inp)
+            argv = ['process_simbench_results.py', '-i', str(inp), '-o', str(outp)]
+            with mock.patch.object(sys, 'argv', argv):
+                process_simbench_results.main()
+            records = json.loads(outp.read_text())
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['auxiliary'], {'options': ['P', 'Q']})
+        self.assertEqual(records[0]['answer_options'], ['P', 'Q'])
+        self.assertEqual(records[0]['human_answer'], {'P': 0.25, 'Q': 0.75})
+        self.assertEqual(records[0]['Response_Distribution'], {'P': 0.25, 'Q': 0.75})
+        self.assertEqual(records[1]['human_answer'], {'P': 0.5, 'Q': 0.5})
+
+
+if __name__ == '__main__':
+    unittest.main()